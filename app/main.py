@@ -7,8 +7,16 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.types import ReplyKeyboardMarkup, KeyboardButton, ReplyKeyboardRemove
 from aiogram.client.default import DefaultBotProperties
 import asyncio
+import glob
+import gzip
+import itertools
 import logging
 import os
+import shutil
+import sys
+import time
+from collections import OrderedDict
+from functools import lru_cache
 from dotenv import load_dotenv
 import sqlite3
 
@@ -26,6 +34,8 @@ def init_db():
     conn = sqlite3.connect(DB_PATH)
     c = conn.cursor()
     c.execute('PRAGMA foreign_keys = ON')
+    # WAL: бэкап читает снимок базы, не мешая обработчикам писать
+    c.execute('PRAGMA journal_mode = WAL')
     c.execute('''CREATE TABLE IF NOT EXISTS users (
         telegram_id INTEGER PRIMARY KEY,
         username TEXT,
@@ -59,6 +69,7 @@ def set_user(telegram_id: int, username: str, bot_token: str = None):
               (telegram_id, username, bot_token))
     conn.commit()
     conn.close()
+    _token_cache[telegram_id] = bool(bot_token)
 
 def set_user_token(telegram_id: int, token: str):
     print(f"[DB] Сохранение токена для пользователя {telegram_id}: {token}")
@@ -71,6 +82,7 @@ def set_user_token(telegram_id: int, token: str):
         print(f"[DB] Пользователь {telegram_id} не найден, добавлен с пустым username.")
     conn.commit()
     conn.close()
+    _token_cache[telegram_id] = bool(token)
 
 def get_user(telegram_id: int):
     conn = sqlite3.connect(DB_PATH)
@@ -82,6 +94,134 @@ def get_user(telegram_id: int):
         return {"username": row[0], "bot_token": row[1]}
     return None
 
+# --- Резервное копирование БД ---
+BACKUP_DIR = os.getenv("TRAINER_BOT_BACKUP_DIR", "backups")
+BACKUP_INTERVAL = int(os.getenv("TRAINER_BOT_BACKUP_INTERVAL", 6 * 60 * 60))  # секунды между бэкапами
+BACKUP_KEEP = int(os.getenv("TRAINER_BOT_BACKUP_KEEP", 7))  # сколько последних архивов хранить
+BACKUP_PROBE_INTERVAL = 0.1  # как часто замерять задержку запросов во время бэкапа
+
+BACKUP_CHECKPOINT_TIMEOUT = 1  # сколько секунд checkpoint может ждать писателей после снимка
+
+def _remove_files(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+def backup_db():
+    # Снимок делается через VACUUM INTO в одной читающей транзакции: в отличие от
+    # пошагового online backup API он не перезапускается при записи из обработчиков,
+    # а в режиме WAL (см. init_db) не блокирует писателей на время копирования.
+    if not os.path.exists(DB_PATH):
+        raise FileNotFoundError(f"База {DB_PATH} не найдена")
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    # Время в UTC с микросекундами и pid: имена уникальны даже для двух бэкапов в одну
+    # секунду и сортируются по времени независимо от перевода часов
+    now = time.time()
+    stamp = f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime(now))}.{int(now * 1e6) % 1000000:06d}Z-{os.getpid()}"
+    raw_path = os.path.join(BACKUP_DIR, f"trainerbot-{stamp}.db.part")
+    gz_part = os.path.join(BACKUP_DIR, f"trainerbot-{stamp}.db.gz.part")
+    gz_path = os.path.join(BACKUP_DIR, f"trainerbot-{stamp}.db.gz")
+    created = []
+    started = time.monotonic()
+    try:
+        # Файлы создаются эксклюзивно: чужой незаконченный бэкап никогда не перезаписывается
+        open(raw_path, "x").close()
+        created += [raw_path, raw_path + "-journal"]
+        src = sqlite3.connect(DB_PATH, timeout=BACKUP_CHECKPOINT_TIMEOUT)
+        try:
+            src.execute("VACUUM INTO ?", (raw_path,))
+            copied = time.monotonic()
+            # Пока шёл снимок, WAL не мог сброситься; возвращаем его к нулевому размеру
+            wal_size = os.path.getsize(DB_PATH + "-wal") if os.path.exists(DB_PATH + "-wal") else 0
+            busy = src.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()[0]
+        finally:
+            src.close()
+        checkpointed = time.monotonic()
+        with open(gz_part, "xb") as raw_out:
+            created.append(gz_part)
+            with gzip.GzipFile(fileobj=raw_out, mode="wb", compresslevel=6) as f_out, open(raw_path, "rb") as f_in:
+                shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+        os.replace(gz_part, gz_path)
+    finally:
+        # Недоделанные файлы не попадают под rotate_backups, поэтому удаляем их сразу
+        _remove_files(*created)
+    rotate_backups()
+    print(f"[DB] Бэкап {gz_path}: копирование {copied - started:.1f} с, "
+          f"checkpoint {checkpointed - copied:.1f} с (WAL {wal_size} байт{', занят писателями' if busy else ''}), "
+          f"сжатие {time.monotonic() - checkpointed:.1f} с, размер {os.path.getsize(gz_path)} байт")
+    return gz_path
+
+def list_backups():
+    # Имена содержат время в UTC, поэтому лексикографический порядок совпадает с хронологическим
+    return sorted(glob.glob(os.path.join(BACKUP_DIR, "trainerbot-*.db.gz")))
+
+def rotate_backups():
+    for path in list_backups()[:-max(BACKUP_KEEP, 1)]:
+        os.remove(path)
+        print(f"[DB] Удалён старый бэкап {path}")
+
+def restore_db(backup_path: str):
+    # База блокируется эксклюзивно на всё время восстановления: если её держит
+    # запущенный бот, восстановление отменяется, а не портит WAL
+    db = sqlite3.connect(DB_PATH, timeout=0, isolation_level=None)
+    try:
+        try:
+            db.execute("PRAGMA locking_mode = EXCLUSIVE")
+            db.execute("BEGIN EXCLUSIVE")
+            db.execute("COMMIT")  # в эксклюзивном режиме блокировка остаётся после COMMIT
+        except sqlite3.OperationalError as e:
+            raise RuntimeError(f"База {DB_PATH} используется другим процессом, остановите бота: {e}") from e
+        tmp_path = DB_PATH + ".restore"
+        try:
+            with gzip.open(backup_path, "rb") as f_in, open(tmp_path, "wb") as f_out:
+                shutil.copyfileobj(f_in, f_out, 1024 * 1024)
+            restored = sqlite3.connect(tmp_path)
+            try:
+                result = restored.execute("PRAGMA integrity_check").fetchone()[0]
+                if result != "ok":
+                    raise RuntimeError(f"Бэкап {backup_path} повреждён: {result}")
+                # Содержимое переносится средствами SQLite под нашей блокировкой,
+                # поэтому файлы -wal/-shm не приходится удалять вручную
+                restored.backup(db)
+            finally:
+                restored.close()
+        except (OSError, EOFError, sqlite3.DatabaseError) as e:
+            raise RuntimeError(f"Бэкап {backup_path} повреждён: {e}") from e
+        finally:
+            _remove_files(tmp_path)
+    finally:
+        db.close()
+    print(f"[DB] База восстановлена из {backup_path}")
+
+async def run_backup():
+    # Бэкап и сжатие идут в отдельном потоке; пока они работают, на event loop
+    # замеряется время того же запроса, что выполняют обработчики
+    task = asyncio.create_task(asyncio.to_thread(backup_db))
+    latencies = []
+    while not task.done():
+        started = time.perf_counter()
+        get_user(0)
+        latencies.append(time.perf_counter() - started)
+        await asyncio.wait({task}, timeout=BACKUP_PROBE_INTERVAL)
+    gz_path = await task
+    latencies.sort()
+    logging.info(f"Задержка get_user во время бэкапа: медиана {latencies[len(latencies) // 2] * 1000:.1f} мс, "
+                 f"максимум {latencies[-1] * 1000:.1f} мс, замеров {len(latencies)}")
+    return gz_path
+
+async def backup_loop():
+    backups = list_backups()
+    # Бот могут перезапускать чаще, чем раз в BACKUP_INTERVAL, поэтому отсчёт ведётся от последнего архива
+    age = time.time() - os.path.getmtime(backups[-1]) if backups else BACKUP_INTERVAL
+    delay = max(BACKUP_INTERVAL - age, 0)
+    while True:
+        await asyncio.sleep(delay)
+        delay = BACKUP_INTERVAL
+        try:
+            await run_backup()
+        except Exception as e:
+            logging.exception(f"Ошибка резервного копирования: {e}")
+
 # FSM
 class BotSetup(StatesGroup):
     waiting_for_token = State()
@@ -108,26 +248,139 @@ class ExerciseFSM(StatesGroup):
     edit_field = State()
     edit_value = State()
 
-# Кнопки
+# Кнопки (статические клавиатуры создаются один раз при импорте)
+_ui_build_started = time.perf_counter()
+back_button = KeyboardButton(text="⬅️ Назад")
+
 main_menu = ReplyKeyboardMarkup(keyboard=[
     [KeyboardButton(text="⚖️ Настроить бота")],
 ], resize_keyboard=True)
 
+# Главное меню тренера с подключённым клиентским ботом
+trainer_menu = ReplyKeyboardMarkup(keyboard=[
+    [KeyboardButton(text="🤖 Мой клиентский бот")],
+    [KeyboardButton(text="💪 Мои упражнения")],
+    [KeyboardButton(text="👥 Мои клиенты")],
+], resize_keyboard=True)
+
 # Кнопка "Назад"
 back_menu = ReplyKeyboardMarkup(keyboard=[
-    [KeyboardButton(text="⬅️ Назад")]
+    [back_button]
 ], resize_keyboard=True)
 
-def get_main_menu(user_id):
+# Раздел "Мои упражнения"
+exercises_section_menu = ReplyKeyboardMarkup(keyboard=[
+    [KeyboardButton(text="Группы мышц"), KeyboardButton(text="Упражнения")],
+    [back_button]
+], resize_keyboard=True)
+
+# Добавить / удалить / редактировать (группы мышц и упражнения)
+crud_menu = ReplyKeyboardMarkup(keyboard=[
+    [KeyboardButton(text="➕ Добавить"), KeyboardButton(text="➖ Удалить"), KeyboardButton(text="♻️ Редактировать")],
+    [back_button]
+], resize_keyboard=True)
+
+EXERCISE_FIELDS = ("Группа мышц", "Название", "Видео", "Описание")
+exercise_fields_menu = ReplyKeyboardMarkup(keyboard=[
+    [KeyboardButton(text=EXERCISE_FIELDS[0]), KeyboardButton(text=EXERCISE_FIELDS[1])],
+    [KeyboardButton(text=EXERCISE_FIELDS[2]), KeyboardButton(text=EXERCISE_FIELDS[3])],
+    [back_button]
+], resize_keyboard=True)
+
+# Тексты
+TOKEN_INSTRUCTION = (
+    "🔐 Вставь сюда токен от нового бота, которого ты создал в @BotFather.\n\n"
+    "<b>Как получить токен:</b>\n"
+    "1. Открой Telegram и найди @BotFather.\n"
+    "2. Нажми /start и выбери <b>New Bot</b> или команду /newbot.\n"
+    "3. Придумай имя и username для бота.\n"
+    "4. После создания @BotFather пришлёт тебе токен — скопируй его сюда.\n\n"
+    "<i>Токен выглядит примерно так:</i> <code>123456789:AA...xyz</code>"
+)
+MUSCLE_GROUPS_TEXT = "В этом разделе вы можете добавлять, удалять и редактировать части тела, например: Руки, Ноги."
+EXERCISES_TEXT = "В этом разделе вы можете добавлять, удалять и редактировать упражнения, например: Подъем на бицепс."
+
+# --- Кэш ---
+UI_CACHE_SIZE = int(os.getenv("TRAINER_BOT_UI_CACHE_SIZE", 1024))  # сколько пользователей держать в кэшах
+
+class LRUCache(OrderedDict):
+    # Словарь ограниченного размера: при переполнении вытесняется давно не использованный ключ
+    def __init__(self, maxsize):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __getitem__(self, key):
+        self.move_to_end(key)
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+
+_token_cache = LRUCache(UI_CACHE_SIZE)  # telegram_id -> есть ли у пользователя токен клиентского бота
+_data_versions = LRUCache(UI_CACHE_SIZE)  # user_id -> версия групп мышц/упражнений
+_version_counter = itertools.count(1)
+
+def bump_data_version(user_id):
+    version = next(_version_counter)
+    _data_versions[user_id] = version
+    return version
+
+def data_version(user_id):
+    # Версии берутся из общего счётчика: пользователь, вытесненный из _data_versions,
+    # получает новую версию и не может попасть на устаревшую запись кэша клавиатур.
+    # Вычисленное значение возвращается напрямую: при UI_CACHE_SIZE=0 кэш сразу его вытесняет
+    if user_id in _data_versions:
+        return _data_versions[user_id]
+    return bump_data_version(user_id)
+
+def user_has_token(user_id):
+    if user_id in _token_cache:
+        return _token_cache[user_id]
     user = get_user(user_id)
-    if user and user["bot_token"]:
-        return ReplyKeyboardMarkup(keyboard=[
-            [KeyboardButton(text="🤖 Мой клиентский бот")],
-            [KeyboardButton(text="💪 Мои упражнения")],
-            [KeyboardButton(text="👥 Мои клиенты")],
-        ], resize_keyboard=True)
-    else:
-        return main_menu
+    has_token = bool(user and user["bot_token"])
+    _token_cache[user_id] = has_token
+    return has_token
+
+# Время построения статического UI при импорте; выводится при TRAINER_BOT_LOG_LEVEL=DEBUG
+UI_BUILD_TIME = time.perf_counter() - _ui_build_started
+
+def get_main_menu(user_id):
+    return trainer_menu if user_has_token(user_id) else main_menu
+
+def list_keyboard(names):
+    return ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text=name)] for name in names] + [[back_button]],
+                               resize_keyboard=True)
+
+# Динамические клавиатуры кэшируются вместе с данными, из которых построены,
+# поэтому при попадании в кэш запрос к БД не выполняется
+@lru_cache(maxsize=UI_CACHE_SIZE)
+def _muscle_groups_ui(user_id, version):
+    names = tuple(name for _, name in get_muscle_groups(user_id))
+    return names, list_keyboard(names)
+
+def muscle_groups_ui(user_id):
+    return _muscle_groups_ui(user_id, data_version(user_id))
+
+@lru_cache(maxsize=UI_CACHE_SIZE)
+def _muscle_picker(user_id, version):
+    muscle_map = {f"{name} (id:{mid})": mid for mid, name in get_muscle_groups(user_id)}
+    return muscle_map, list_keyboard(muscle_map)
+
+def muscle_picker(user_id):
+    # Соответствие "надпись -> id" и клавиатура выбора группы мышц
+    muscle_map, keyboard = _muscle_picker(user_id, data_version(user_id))
+    return dict(muscle_map), keyboard
+
+@lru_cache(maxsize=UI_CACHE_SIZE)
+def _exercises_ui(user_id, version):
+    names = tuple(get_exercises(user_id))
+    return names, list_keyboard(names)
+
+def exercises_ui(user_id):
+    return _exercises_ui(user_id, data_version(user_id))
 
 @dp.message(lambda message: message.text == "/start")
 async def cmd_start(message: Message):
@@ -139,16 +392,7 @@ async def cmd_start(message: Message):
 
 @dp.message(lambda message: message.text == "⚖️ Настроить бота")
 async def ask_token(message: Message, state: FSMContext):
-    instruction = (
-        "🔐 Вставь сюда токен от нового бота, которого ты создал в @BotFather.\n\n"
-        "<b>Как получить токен:</b>\n"
-        "1. Открой Telegram и найди @BotFather.\n"
-        "2. Нажми /start и выбери <b>New Bot</b> или команду /newbot.\n"
-        "3. Придумай имя и username для бота.\n"
-        "4. После создания @BotFather пришлёт тебе токен — скопируй его сюда.\n\n"
-        "<i>Токен выглядит примерно так:</i> <code>123456789:AA...xyz</code>"
-    )
-    await message.answer(instruction, reply_markup=back_menu, parse_mode=ParseMode.HTML)
+    await message.answer(TOKEN_INSTRUCTION, reply_markup=back_menu, parse_mode=ParseMode.HTML)
     await state.set_state(BotSetup.waiting_for_token)
 
 @dp.message(lambda message: message.text == "⬅️ Назад")
@@ -210,26 +454,15 @@ async def my_client_bot(message: Message):
 
 @dp.message(lambda message: message.text == "💪 Мои упражнения")
 async def my_exercises(message: Message, state: FSMContext):
-    keyboard = ReplyKeyboardMarkup(keyboard=[
-        [KeyboardButton(text="Группы мышц"), KeyboardButton(text="Упражнения")],
-        [KeyboardButton(text="⬅️ Назад")]
-    ], resize_keyboard=True)
     await state.set_state(NavStates.exercises)
     await state.update_data(prev=NavStates.main.state)
-    await message.answer("Выберите раздел:", reply_markup=keyboard)
+    await message.answer("Выберите раздел:", reply_markup=exercises_section_menu)
 
 @dp.message(lambda message: message.text == "Группы мышц")
 async def muscle_groups(message: Message, state: FSMContext):
-    keyboard = ReplyKeyboardMarkup(keyboard=[
-        [KeyboardButton(text="➕ Добавить"), KeyboardButton(text="➖ Удалить"), KeyboardButton(text="♻️ Редактировать")],
-        [KeyboardButton(text="⬅️ Назад")]
-    ], resize_keyboard=True)
     await state.set_state(NavStates.muscle_groups)
     await state.update_data(prev=NavStates.exercises.state)
-    await message.answer(
-        "В этом разделе вы можете добавлять, удалять и редактировать части тела, например: Руки, Ноги.",
-        reply_markup=keyboard
-    )
+    await message.answer(MUSCLE_GROUPS_TEXT, reply_markup=crud_menu)
 
 def get_muscle_groups(user_id):
     conn = sqlite3.connect(DB_PATH)
@@ -253,6 +486,7 @@ def add_muscle_group(user_id, name):
     try:
         c.execute('INSERT INTO muscle_groups (user_id, name) VALUES (?, ?)', (user_id, name))
         conn.commit()
+        bump_data_version(user_id)
         return True
     except sqlite3.IntegrityError:
         return False
@@ -265,6 +499,7 @@ def delete_muscle_group(user_id, name):
     c.execute('DELETE FROM muscle_groups WHERE user_id=? AND name=?', (user_id, name))
     conn.commit()
     conn.close()
+    bump_data_version(user_id)
 
 def rename_muscle_group(user_id, old_name, new_name):
     conn = sqlite3.connect(DB_PATH)
@@ -272,6 +507,7 @@ def rename_muscle_group(user_id, old_name, new_name):
     try:
         c.execute('UPDATE muscle_groups SET name=? WHERE user_id=? AND name=?', (new_name, user_id, old_name))
         conn.commit()
+        bump_data_version(user_id)
         return c.rowcount > 0
     finally:
         conn.close()
@@ -299,27 +535,24 @@ async def add_muscle_save(message: Message, state: FSMContext):
 @dp.message(lambda m: m.text == "➖ Удалить")
 async def del_muscle_start(message: Message, state: FSMContext):
     user_id = message.from_user.id
-    muscles = get_muscle_groups(user_id)
+    muscles, keyboard = muscle_groups_ui(user_id)
     await state.set_state(MuscleFSM.delete_select)
     await state.update_data(prev=NavStates.muscle_groups.state)
     if not muscles:
         await message.answer("У вас нет существующих частей тела.")
         await muscle_groups(message, state)
         return
-    keyboard = ReplyKeyboardMarkup(keyboard=[
-        [KeyboardButton(text=name)] for _, name in muscles
-    ] + [[KeyboardButton(text="⬅️ Назад")]], resize_keyboard=True)
     await message.answer("Выберите часть тела для удаления:", reply_markup=keyboard)
 
 @dp.message(MuscleFSM.delete_select)
 async def del_muscle_confirm(message: Message, state: FSMContext):
     user_id = message.from_user.id
     name = message.text.strip()
-    muscles = get_muscle_groups(user_id)
+    muscles, _ = muscle_groups_ui(user_id)
     if name == "⬅️ Назад":
         await muscle_groups(message, state)
         return
-    if name not in [m[1] for m in muscles]:
+    if name not in muscles:
         await message.answer("Такой части тела нет. Выберите из списка.")
         return
     delete_muscle_group(user_id, name)
@@ -329,27 +562,24 @@ async def del_muscle_confirm(message: Message, state: FSMContext):
 @dp.message(lambda m: m.text == "♻️ Редактировать")
 async def edit_muscle_start(message: Message, state: FSMContext):
     user_id = message.from_user.id
-    muscles = get_muscle_groups(user_id)
+    muscles, keyboard = muscle_groups_ui(user_id)
     await state.set_state(MuscleFSM.edit_select)
     await state.update_data(prev=NavStates.muscle_groups.state)
     if not muscles:
         await message.answer("У вас нет существующих частей тела.")
         await muscle_groups(message, state)
         return
-    keyboard = ReplyKeyboardMarkup(keyboard=[
-        [KeyboardButton(text=name)] for _, name in muscles
-    ] + [[KeyboardButton(text="⬅️ Назад")]], resize_keyboard=True)
     await message.answer("Выберите часть тела для редактирования:", reply_markup=keyboard)
 
 @dp.message(MuscleFSM.edit_select)
 async def edit_muscle_ask_new(message: Message, state: FSMContext):
     user_id = message.from_user.id
     name = message.text.strip()
-    muscles = get_muscle_groups(user_id)
+    muscles, _ = muscle_groups_ui(user_id)
     if name == "⬅️ Назад":
         await muscle_groups(message, state)
         return
-    if name not in [m[1] for m in muscles]:
+    if name not in muscles:
         await message.answer("Такой части тела нет. Выберите из списка.")
         return
     await state.set_state(MuscleFSM.edit_rename)
@@ -382,6 +612,7 @@ def add_exercise(user_id, muscle_group_id, name, video, description):
         c.execute('INSERT INTO exercises (user_id, muscle_group, name, video, description) VALUES (?, ?, ?, ?, ?)',
                   (user_id, muscle_group_id, name, video, description))
         conn.commit()
+        bump_data_version(user_id)
         return True
     except sqlite3.IntegrityError:
         return False
@@ -410,6 +641,7 @@ def delete_exercise(user_id, name):
     c.execute('DELETE FROM exercises WHERE user_id=? AND name=?', (user_id, name))
     conn.commit()
     conn.close()
+    bump_data_version(user_id)
 
 def update_exercise(user_id, old_name, muscle_group=None, name=None, video=None, description=None):
     conn = sqlite3.connect(DB_PATH)
@@ -436,33 +668,26 @@ def update_exercise(user_id, old_name, muscle_group=None, name=None, video=None,
     c.execute(f'UPDATE exercises SET {", ".join(fields)} WHERE user_id=? AND name=?', values)
     conn.commit()
     conn.close()
+    bump_data_version(user_id)
     return True
 
 @dp.message(lambda m: m.text == "Упражнения")
 async def exercises_menu(message: Message, state: FSMContext):
-    keyboard = ReplyKeyboardMarkup(keyboard=[
-        [KeyboardButton(text="➕ Добавить"), KeyboardButton(text="➖ Удалить"), KeyboardButton(text="♻️ Редактировать")],
-        [KeyboardButton(text="⬅️ Назад")]
-    ], resize_keyboard=True)
     await state.set_state(NavStates.exercises)
     await state.update_data(prev=NavStates.exercises.state)
-    await message.answer(
-        "В этом разделе вы можете добавлять, удалять и редактировать упражнения, например: Подъем на бицепс.",
-        reply_markup=keyboard
-    )
+    await message.answer(EXERCISES_TEXT, reply_markup=crud_menu)
 
 # --- Добавление упражнения ---
 @dp.message(lambda m: m.text == "➕ Добавить" and (state := FSMContext.get_current()) and state.state in [NavStates.exercises.state])
 async def add_exercise_start(message: Message, state: FSMContext):
     user_id = message.from_user.id
-    muscles = get_muscle_groups(user_id)
-    if not muscles:
+    muscle_map, keyboard = muscle_picker(user_id)
+    if not muscle_map:
         await message.answer("Сначала добавьте хотя бы одну группу мышц.")
         await exercises_menu(message, state)
         return
-    keyboard = ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text=f"{name} (id:{mid})")] for mid, name in muscles] + [[KeyboardButton(text="⬅️ Назад")]], resize_keyboard=True)
     await state.set_state(ExerciseFSM.add_select_muscle)
-    await state.update_data(prev=NavStates.exercises.state, muscle_map={f"{name} (id:{mid})": mid for mid, name in muscles})
+    await state.update_data(prev=NavStates.exercises.state, muscle_map=muscle_map)
     await message.answer("Выберите группу мышц для упражнения:", reply_markup=keyboard)
 
 @dp.message(ExerciseFSM.add_select_muscle)
@@ -519,21 +744,20 @@ async def add_exercise_save(message: Message, state: FSMContext):
 @dp.message(lambda m: m.text == "➖ Удалить" and (state := FSMContext.get_current()) and state.state in [NavStates.exercises.state])
 async def del_exercise_start(message: Message, state: FSMContext):
     user_id = message.from_user.id
-    exercises = get_exercises(user_id)
+    exercises, keyboard = exercises_ui(user_id)
     await state.set_state(ExerciseFSM.delete_select)
     await state.update_data(prev=NavStates.exercises.state)
     if not exercises:
         await message.answer("У вас нет существующих упражнений.")
         await exercises_menu(message, state)
         return
-    keyboard = ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text=e)] for e in exercises] + [[KeyboardButton(text="⬅️ Назад")]], resize_keyboard=True)
     await message.answer("Выберите упражнение для удаления:", reply_markup=keyboard)
 
 @dp.message(ExerciseFSM.delete_select)
 async def del_exercise_confirm(message: Message, state: FSMContext):
     user_id = message.from_user.id
     name = message.text.strip()
-    exercises = get_exercises(user_id)
+    exercises, _ = exercises_ui(user_id)
     if name == "⬅️ Назад":
         await exercises_menu(message, state)
         return
@@ -548,21 +772,20 @@ async def del_exercise_confirm(message: Message, state: FSMContext):
 @dp.message(lambda m: m.text == "♻️ Редактировать" and (state := FSMContext.get_current()) and state.state in [NavStates.exercises.state])
 async def edit_exercise_start(message: Message, state: FSMContext):
     user_id = message.from_user.id
-    exercises = get_exercises(user_id)
+    exercises, keyboard = exercises_ui(user_id)
     await state.set_state(ExerciseFSM.edit_select)
     await state.update_data(prev=NavStates.exercises.state)
     if not exercises:
         await message.answer("У вас нет существующих упражнений.")
         await exercises_menu(message, state)
         return
-    keyboard = ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text=e)] for e in exercises] + [[KeyboardButton(text="⬅️ Назад")]], resize_keyboard=True)
     await message.answer("Выберите упражнение для редактирования:", reply_markup=keyboard)
 
 @dp.message(ExerciseFSM.edit_select)
 async def edit_exercise_field(message: Message, state: FSMContext):
     user_id = message.from_user.id
     name = message.text.strip()
-    exercises = get_exercises(user_id)
+    exercises, _ = exercises_ui(user_id)
     if name == "⬅️ Назад":
         await exercises_menu(message, state)
         return
@@ -571,12 +794,7 @@ async def edit_exercise_field(message: Message, state: FSMContext):
         return
     await state.set_state(ExerciseFSM.edit_field)
     await state.update_data(editing=name, prev=NavStates.exercises.state)
-    keyboard = ReplyKeyboardMarkup(keyboard=[
-        [KeyboardButton(text="Группа мышц"), KeyboardButton(text="Название")],
-        [KeyboardButton(text="Видео"), KeyboardButton(text="Описание")],
-        [KeyboardButton(text="⬅️ Назад")]
-    ], resize_keyboard=True)
-    await message.answer("Что хотите изменить?", reply_markup=keyboard)
+    await message.answer("Что хотите изменить?", reply_markup=exercise_fields_menu)
 
 @dp.message(ExerciseFSM.edit_field)
 async def edit_exercise_value(message: Message, state: FSMContext):
@@ -586,15 +804,14 @@ async def edit_exercise_value(message: Message, state: FSMContext):
     if field == "⬅️ Назад":
         await edit_exercise_start(message, state)
         return
-    if field not in ["Группа мышц", "Название", "Видео", "Описание"]:
+    if field not in EXERCISE_FIELDS:
         await message.answer("Выберите поле из списка.")
         return
     await state.set_state(ExerciseFSM.edit_value)
     await state.update_data(edit_field=field, prev=NavStates.exercises.state)
     if field == "Группа мышц":
-        muscles = get_muscle_groups(user_id)
-        keyboard = ReplyKeyboardMarkup(keyboard=[[KeyboardButton(text=f"{name} (id:{mid})")] for mid, name in muscles] + [[KeyboardButton(text="⬅️ Назад")]], resize_keyboard=True)
-        await state.update_data(muscle_map={f"{name} (id:{mid})": mid for mid, name in muscles})
+        muscle_map, keyboard = muscle_picker(user_id)
+        await state.update_data(muscle_map=muscle_map)
         await message.answer("Выберите новую группу мышц:", reply_markup=keyboard)
     else:
         await message.answer(f"Введите новое значение для поля '{field}':")
@@ -630,7 +847,25 @@ async def edit_exercise_save(message: Message, state: FSMContext):
         await message.answer(f"Описание для '{old_name}' изменено.")
     await exercises_menu(message, state)
 
+async def main():
+    backup_task = asyncio.create_task(backup_loop())
+    try:
+        await dp.start_polling(bot)
+    finally:
+        backup_task.cancel()
+        try:
+            await backup_task
+        except asyncio.CancelledError:
+            pass
+
 if __name__ == "__main__":
-    init_db()
-    logging.basicConfig(level=logging.INFO)
-    asyncio.run(dp.start_polling(bot))
+    # python main.py backup — разовый бэкап, python main.py restore <файл.db.gz> — восстановление
+    if len(sys.argv) > 1 and sys.argv[1] == "backup":
+        backup_db()
+    elif len(sys.argv) > 2 and sys.argv[1] == "restore":
+        restore_db(sys.argv[2])
+    else:
+        init_db()
+        logging.basicConfig(level=os.getenv("TRAINER_BOT_LOG_LEVEL", "INFO"))
+        logging.debug(f"Статические клавиатуры и тексты построены за {UI_BUILD_TIME * 1000:.2f} мс")
+        asyncio.run(main())